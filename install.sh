@@ -78,6 +78,13 @@ if ! python3 -c "import evdev" 2>/dev/null; then
     apt-get install -y python3-evdev
 fi
 
+# Check for Python pyudev module (optional, used for instant mouse hotplug)
+if ! python3 -c "import pyudev" 2>/dev/null; then
+    log_info "Installing python3-pyudev..."
+    apt-get update -qq
+    apt-get install -y python3-pyudev || log_warn "python3-pyudev not installed; mouse hotplug will use inotify"
+fi
+
 # Prompt for keyboard layout if not already set
 if [ -z "$KEYBOARD_LAYOUT" ]; then
     echo ""
@@ -12,17 +12,29 @@ Pi 500+ internal keyboard + mouse -> USB HID gadget bridge
 from __future__ import annotations
 
 import argparse
+import ctypes
+import io
 import os
 import sys
 import time
 import errno
-import threading
+import select
+import selectors
+import stat
+import struct
 import subprocess
+from collections import deque
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Optional, Set
+from typing import Deque, Dict, List, Optional
 
 from evdev import InputDevice, ecodes, list_devices
 
+try:
+    import pyudev
+except ImportError:  # optional: fall back to inotify on /dev/input
+    pyudev = None
+
 
 # ============================================================================
 # USB HID Keyboard
@@ -123,6 +135,18 @@ KEY_TO_HID: Dict[int, int] = {
     ecodes.KEY_ZENKAKUHANKAKU: 0x94,
 }
 
+# HID usages 0xE0-0xE7 are the modifier keys, in modifier bit order
+HID_USAGE_LEFTCTRL = 0xE0
+
+# Dense lookup table indexed by Linux keycode (0 = not mapped). Modifiers are
+# stored as their 0xE0-0xE7 usage so one lookup classifies every key.
+# EV_KEY codes are always below KEY_CNT, so no bounds check is needed.
+KEY_LUT = bytearray(ecodes.KEY_CNT)
+for _code, _usage in KEY_TO_HID.items():
+    KEY_LUT[_code] = _usage
+for _code, _bit in MODIFIER_KEYS.items():
+    KEY_LUT[_code] = HID_USAGE_LEFTCTRL + _bit.bit_length() - 1
+
 # Mouse button mapping: Linux BTN_* -> HID button bit
 BUTTON_MAP = {
     ecodes.BTN_LEFT: 0x01,
@@ -130,6 +154,32 @@ BUTTON_MAP = {
     ecodes.BTN_MIDDLE: 0x04,
 }
 
+# Dense lookup table indexed by Linux keycode (0 = not a mouse button).
+# Indexed by the full code, as mice may also emit KEY_* codes.
+BUTTON_LUT = bytearray(ecodes.KEY_CNT)
+for _code, _bit in BUTTON_MAP.items():
+    BUTTON_LUT[_code] = _bit
+
+# Event names for --show, resolved once instead of per printed event
+KEY_NAMES = [ecodes.KEY.get(_code, f"KEY_{_code}") for _code in range(ecodes.KEY_CNT)]
+REL_NAMES = [ecodes.REL.get(_code, f"REL_{_code}") for _code in range(ecodes.REL_CNT)]
+BUTTON_NAMES = {_code: ecodes.BTN.get(_code, f"BTN_{_code}") for _code in BUTTON_MAP}
+
+
+# Raw struct input_event: struct timeval time; __u16 type; __u16 code; __s32 value
+# The timestamp is skipped as padding, so decoding yields only (type, code, value).
+INPUT_EVENT = struct.Struct("%dxHHi" % struct.calcsize("ll"))
+
+# Maximum number of input events pulled from an evdev fd per read()
+EVENT_BATCH = 64
+
+# Mouse report per hid-mouse.bin: buttons, then signed X, Y and wheel (-127..127)
+MOUSE_REPORT = struct.Struct("<Bbbb")
+
+# "All released" reports, sent at startup, on mouse attach and at shutdown
+EMPTY_KEYBOARD_REPORT = bytes(8)
+EMPTY_MOUSE_REPORT = bytes(MOUSE_REPORT.size)
+
 
 # ============================================================================
 # Utilities
@@ -141,63 +191,42 @@ def log(msg: str) -> None:
 
 
 def open_hidg(path: str) -> int:
-    """Open HID gadget device for writing."""
-    fd = os.open(path, os.O_WRONLY)
+    """Open HID gadget device for non-blocking writing."""
+    # O_NOCTTY: never become our controlling terminal, whatever the node turns out to be
+    fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK | os.O_CLOEXEC | os.O_NOCTTY)
     return fd
 
 
-def write_report(fd: int, report: bytes) -> None:
-    """Write HID report, handling EAGAIN and EPIPE when endpoint not ready."""
-    max_retries = 100  # Maximum 10 seconds total
-    retry_count = 0
+def is_char_device(path: str) -> bool:
+    """True if path exists and is a character device node."""
+    try:
+        return stat.S_ISCHR(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def key_name(code: int) -> str:
+    """Return the KEY_* name of a keycode (debug output only)."""
+    return KEY_NAMES[code]
 
+
+def clamp_i8(v: int) -> int:
+    """Clamp a mouse delta to -127..127 (comparisons instead of max()/min() calls)."""
+    return 127 if v > 127 else (-127 if v < -127 else v)
+
+
+def read_events(fd: int):
+    """Yield raw input events as (type, code, value) until the fd is drained."""
+    batch_size = INPUT_EVENT.size * EVENT_BATCH
     while True:
         try:
-            os.write(fd, report)
+            data = os.read(fd, batch_size)
+        except BlockingIOError:
+            return
+        yield from INPUT_EVENT.iter_unpack(data)
+        if len(data) < batch_size:
+            # Short read: nothing else is buffered
             return
-        except BlockingIOError as e:
-            if e.errno != errno.EAGAIN:
-                raise
-            time.sleep(0.01)
-        except BrokenPipeError as e:
-            # EPIPE/ENOTCONN/ESHUTDOWN: USB gadget endpoint not yet established
-            if e.errno not in (errno.EPIPE, errno.ENOTCONN, errno.ESHUTDOWN):
-                raise
-            retry_count += 1
-            if retry_count >= max_retries:
-                log(f"ERROR: Failed to write HID report after {max_retries} retries")
-                raise
-            time.sleep(0.1)
-
-
-def build_keyboard_report(mod_mask: int, pressed_usages: Set[int]) -> bytes:
-    """Build 8-byte USB HID keyboard report."""
-    keys = sorted(pressed_usages)[:6]
-    while len(keys) < 6:
-        keys.append(0)
-    return bytes([mod_mask & 0xFF, 0x00] + keys)
-
-
-def clamp(value: int, min_val: int = -127, max_val: int = 127) -> int:
-    """Clamp value to signed byte range."""
-    return max(min_val, min(max_val, value))
-
-
-def signed_byte(value: int) -> int:
-    """Convert signed int to unsigned byte (two's complement)."""
-    if value < 0:
-        return (256 + value) & 0xFF
-    return value & 0xFF
-
-
-def build_mouse_report(buttons: int, dx: int, dy: int, wheel: int) -> bytes:
-    """Build 4-byte USB HID mouse report."""
-    return bytes([
-        buttons & 0xFF,
-        signed_byte(clamp(dx)),
-        signed_byte(clamp(dy)),
-        signed_byte(clamp(wheel))
-    ])
 
 
 def pick_keyboard_device() -> InputDevice:
@@ -216,9 +245,18 @@ def pick_keyboard_device() -> InputDevice:
     return keyboards[0]
 
 
-def pick_mouse_device() -> Optional[InputDevice]:
-    """Auto-detect mouse device. Returns None if no mouse found."""
-    devs = [InputDevice(p) for p in list_devices()]
+def pick_mouse_device(paths: Optional[List[str]] = None) -> Optional[InputDevice]:
+    """Auto-detect mouse device among paths (all evdev nodes if omitted). Returns None if no mouse found."""
+    if paths is None:
+        devs = [InputDevice(p) for p in list_devices()]
+    else:
+        # Hinted nodes may already be gone again
+        devs = []
+        for p in paths:
+            try:
+                devs.append(InputDevice(p))
+            except OSError:
+                pass
     mice = []
 
     for d in devs:
@@ -232,11 +270,38 @@ def pick_mouse_device() -> Optional[InputDevice]:
         if has_rel_xy and has_buttons:
             mice.append(d)
 
-    if not mice:
-        return None
-
     mice.sort(key=lambda d: ("mouse" not in (d.name or "").lower(), d.path))
-    return mice[0]
+    for d in devs:
+        if not mice or d is not mice[0]:
+            d.close()
+    return mice[0] if mice else None
+
+
+def enable_realtime(priority: int) -> None:
+    """Lock memory and switch to SCHED_FIFO (needs CAP_IPC_LOCK / CAP_SYS_NICE)."""
+    MCL_CURRENT, MCL_FUTURE = 1, 2
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        log("Locked process memory")
+    except (OSError, AttributeError) as e:
+        log(f"WARNING: mlockall failed: {e}")
+
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        log(f"Using SCHED_FIFO priority {priority}")
+    except OSError as e:
+        log(f"WARNING: Failed to set SCHED_FIFO: {e}")
+
+
+def set_cpu_affinity(cpu: int) -> None:
+    """Pin the bridge to a single CPU so it is not migrated between cores."""
+    try:
+        os.sched_setaffinity(0, {cpu})
+        log(f"Pinned to CPU {cpu}")
+    except OSError as e:
+        log(f"WARNING: Failed to pin to CPU {cpu}: {e}")
 
 
 def setup_hid_gadget(script_dir: Path) -> bool:
@@ -269,77 +334,282 @@ def setup_hid_gadget(script_dir: Path) -> bool:
 
 
 # ============================================================================
-# Keyboard Bridge
+# Input Hotplug
 # ============================================================================
 
-def run_keyboard_bridge(args, hidfd: int) -> None:
-    """Run keyboard bridge in main thread."""
-    dev = InputDevice(args.event) if args.event else pick_keyboard_device()
-    log(f"Using keyboard device: {dev.path} ({dev.name})")
+class UdevHotplug:
+    """udev netlink monitor for the input subsystem."""
+
+    def __init__(self):
+        self.monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+        self.monitor.filter_by("input")
+        self.monitor.start()
+
+    def fileno(self) -> int:
+        return self.monitor.fileno()
+
+    def added_nodes(self) -> List[str]:
+        """Drain pending udev events. Returns the evdev nodes that were added."""
+        added = []
+        while True:
+            udev_dev = self.monitor.poll(timeout=0)
+            if udev_dev is None:
+                return added
+            node = udev_dev.device_node or ""
+            if udev_dev.action == "add" and node.startswith("/dev/input/event"):
+                added.append(node)
+
+
+class InotifyHotplug:
+    """inotify watch on /dev/input, used when pyudev is not installed."""
+
+    IN_CREATE = 0x100
+    # struct inotify_event: int wd; uint32_t mask, cookie, len; char name[len]
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self, path: bytes = b"/dev/input"):
+        self.dir = os.fsdecode(path)
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        if libc.inotify_add_watch(self.fd, path, self.IN_CREATE) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, os.strerror(err))
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def added_nodes(self) -> List[str]:
+        """Drain pending inotify events. Returns the event* nodes that were created."""
+        added = []
+        while True:
+            try:
+                buf = os.read(self.fd, 4096)
+            except BlockingIOError:
+                return added
+            offset = 0
+            while offset < len(buf):
+                _wd, _mask, _cookie, length = self.EVENT.unpack_from(buf, offset)
+                offset += self.EVENT.size
+                name = buf[offset:offset + length].rstrip(b"\0")
+                if name.startswith(b"event"):
+                    added.append(os.path.join(self.dir, os.fsdecode(name)))
+                offset += length
+
+
+def open_hotplug_monitor():
+    """Watch for new input devices via udev, else inotify. Returns None if neither works."""
+    if pyudev is not None:
+        try:
+            return UdevHotplug()
+        except Exception as e:
+            log(f"udev monitor unavailable: {e}")
+    try:
+        return InotifyHotplug()
+    except (OSError, AttributeError) as e:
+        log(f"inotify watch unavailable: {e}")
+    return None
 
-    if args.grab:
-        dev.grab()
-        log("Grabbed keyboard device exclusively")
 
-    pressed_keys: Set[int] = set()
-    pressed_usages: Set[int] = set()
-    mod_mask = 0
+# ============================================================================
+# HID Gadget Output
+# ============================================================================
 
-    # Send initial "all released"
-    write_report(hidfd, build_keyboard_report(0, set()))
+# Maximum number of queued reports handed to a single writev() (below IOV_MAX)
+WRITEV_MAX = 64
 
-    try:
-        for e in dev.read_loop():
-            if e.type != ecodes.EV_KEY:
+
+class HidGadget:
+    """Non-blocking HID gadget endpoint with a queue of unsent reports."""
+
+    max_retries = 100  # Maximum 10 seconds waiting for the host
+    # Reports kept while the host is not reading; the oldest are dropped beyond this.
+    # Every report carries the full button/key state, so the host still ends up current
+    max_pending = 256
+
+    def __init__(self, fd: int):
+        self.fd = fd
+        self.pending: Deque[bytes] = deque(maxlen=self.max_pending)
+        self.want_write = False                # waiting for the fd to become writable
+        self.retry_at: Optional[float] = None  # waiting for the host to connect
+        self.retry_count = 0
+
+    def write(self, report) -> None:
+        """Queue a report. The reactor sends everything queued once per wakeup."""
+        self.pending.append(bytes(report))
+
+    def can_flush(self) -> bool:
+        """True if reports are queued and nothing is blocking a flush."""
+        return bool(self.pending) and not self.want_write and self.retry_at is None
+
+    def flush(self) -> None:
+        """Send queued reports until the queue is empty or the endpoint is busy."""
+        pending = self.pending
+        self.want_write = False
+        self.retry_at = None
+
+        while pending:
+            try:
+                # One syscall for the whole backlog; the kernel stops at the first busy report
+                if len(pending) <= WRITEV_MAX:
+                    written = os.writev(self.fd, pending)
+                else:
+                    written = os.writev(self.fd, list(islice(pending, WRITEV_MAX)))
+            except BlockingIOError as e:
+                if e.errno != errno.EAGAIN:
+                    raise
+                # Previous report still in flight: resume once writable
+                self.want_write = True
+                return
+            except BrokenPipeError as e:
+                # EPIPE/ENOTCONN/ESHUTDOWN: USB gadget endpoint not yet established
+                if e.errno not in (errno.EPIPE, errno.ENOTCONN, errno.ESHUTDOWN):
+                    raise
+                self.retry_count += 1
+                if self.retry_count >= self.max_retries:
+                    log(f"ERROR: Failed to write HID report after {self.max_retries} retries")
+                    raise
+                self.retry_at = time.monotonic() + 0.1
+                return
+
+            self.retry_count = 0
+            while written > 0:
+                head = pending[0]
+                if written < len(head):
+                    # Short write: keep the unsent tail at the front of the queue
+                    pending[0] = head[written:]
+                    break
+                written -= len(head)
+                pending.popleft()
+
+    def sync(self, timeout: float) -> None:
+        """Block until queued reports are sent or timeout expires (used at shutdown)."""
+        end = time.monotonic() + timeout
+        self.flush()
+        while self.pending:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return
+            if self.want_write:
+                select.select([], [self.fd], [], remaining)
+            else:
+                time.sleep(max(0.0, min(remaining, self.retry_at - time.monotonic())))
+            self.flush()
+
+
+# ============================================================================
+# Keyboard Bridge
+# ============================================================================
+
+class KeyboardBridge:
+    """Keyboard bridge driven by the reactor."""
+
+    def __init__(self, args, hid: HidGadget, dev: InputDevice):
+        self.args = args
+        self.hid = hid
+        self.dev = dev
+        # Bit n set = HID usage n is held
+        self.pressed_mask = 0
+        self.mod_mask = 0
+        # Live 8-byte report: [modifiers, reserved, 6 key slots], patched in place
+        self.report = bytearray(8)
+        # Report changed since the last SYN_REPORT
+        self.dirty = False
+        # Last report handed to the gadget
+        self.last_report = EMPTY_KEYBOARD_REPORT
+
+        if args.grab:
+            dev.grab()
+            log("Grabbed keyboard device exclusively")
+        os.set_blocking(dev.fd, False)
+
+        # Send initial "all released"
+        hid.write(EMPTY_KEYBOARD_REPORT)
+
+    def handle_events(self) -> None:
+        """Process buffered events from the keyboard device."""
+        # Bind constants and attributes used per event to locals
+        EV_KEY = ecodes.EV_KEY
+        EV_SYN = ecodes.EV_SYN
+        SYN_REPORT = ecodes.SYN_REPORT
+        key_lut = KEY_LUT
+        report = self.report
+        write = self.hid.write
+        show = self.args.show
+
+        for etype, code, value in read_events(self.dev.fd):
+            if etype != EV_KEY:
+                # One report per input frame, however many keys changed in it
+                if etype == EV_SYN and code == SYN_REPORT and self.dirty:
+                    self.dirty = False
+                    # Keyboard reports are absolute state: a repeat tells the host nothing
+                    if report != self.last_report:
+                        self.last_report = bytes(report)
+                        write(self.last_report)
                 continue
 
-            key_event = ecodes.KEY.get(e.code, f"KEY_{e.code}")
-            is_down = e.value == 1
-            is_up = e.value == 0
-            is_repeat = e.value == 2
+            is_down = value == 1
+            is_up = value == 0
+            is_repeat = value == 2
 
-            if args.show:
-                print(f"EV_KEY {key_event} value={e.value}", file=sys.stderr)
+            if show:
+                print(f"EV_KEY {key_name(code)} value={value}", file=sys.stderr)
 
             if is_repeat:
                 continue
 
+            hid_usage = key_lut[code]
+
             # Modifiers
-            if e.code in MODIFIER_KEYS:
-                bit = MODIFIER_KEYS[e.code]
+            if hid_usage >= HID_USAGE_LEFTCTRL:
+                bit = 1 << (hid_usage - HID_USAGE_LEFTCTRL)
                 if is_down:
-                    mod_mask |= bit
+                    self.mod_mask |= bit
                 elif is_up:
-                    mod_mask &= (~bit & 0xFF)
-                write_report(hidfd, build_keyboard_report(mod_mask, pressed_usages))
+                    self.mod_mask &= (~bit & 0xFF)
+                report[0] = self.mod_mask
+                self.dirty = True
                 continue
 
             # Regular keys
-            hid_usage = KEY_TO_HID.get(e.code)
-            if hid_usage is None:
-                if args.show:
-                    print(f"[!] Unmapped key: {key_event}", file=sys.stderr)
+            if not hid_usage:
+                if show:
+                    print(f"[!] Unmapped key: {key_name(code)}", file=sys.stderr)
                 continue
 
             if is_down:
-                pressed_keys.add(e.code)
-                pressed_usages.add(hid_usage)
+                self.pressed_mask |= 1 << hid_usage
+                # Take the first free slot; beyond 6 keys the usage waits for one
+                if report.find(hid_usage, 2) < 0:
+                    slot = report.find(0, 2)
+                    if slot > 0:
+                        report[slot] = hid_usage
             elif is_up:
-                pressed_keys.discard(e.code)
-                pressed_usages.discard(hid_usage)
-
-            write_report(hidfd, build_keyboard_report(mod_mask, pressed_usages))
-
-    except KeyboardInterrupt:
-        pass
-    finally:
+                self.pressed_mask &= ~(1 << hid_usage)
+                slot = report.find(hid_usage, 2)
+                if slot > 0:
+                    report[slot] = 0
+                    # Hand the freed slot to the lowest held usage that did not fit
+                    if self.pressed_mask.bit_count() >= 6:
+                        mask = self.pressed_mask
+                        for usage in report[2:]:
+                            mask &= ~(1 << usage)
+                        if mask:
+                            report[slot] = (mask & -mask).bit_length() - 1
+
+            self.dirty = True
+
+    def close(self) -> None:
+        """Release all keys and the keyboard grab."""
         try:
-            write_report(hidfd, build_keyboard_report(0, set()))
+            self.hid.write(EMPTY_KEYBOARD_REPORT)
         except Exception:
             pass
         try:
-            if args.grab:
-                dev.ungrab()
+            if self.args.grab:
+                self.dev.ungrab()
         except Exception:
             pass
 
@@ -351,127 +621,318 @@ def run_keyboard_bridge(args, hidfd: int) -> None:
 class MouseBridge:
     """Mouse bridge that handles dynamic attach/detach."""
 
-    def __init__(self, args, hidfd: int):
+    def __init__(self, args, hid: HidGadget):
         self.args = args
-        self.hidfd = hidfd
-        self.running = True
+        self.hid = hid
         self.current_device: Optional[InputDevice] = None
+        self.buttons = 0
+        self.prev_buttons = 0
+        self.dx_accum = 0
+        self.dy_accum = 0
+        self.wheel_accum = 0
+        # Live 4-byte report: [buttons, dx, dy, wheel], packed in place
+        self.report = bytearray(MOUSE_REPORT.size)
+        # Motion is batched for this long before a report is sent (0 = per SYN_REPORT)
+        self.coalesce = args.mouse_coalesce_ms / 1000.0
+        self.flush_deadline: Optional[float] = None
+        # Kernel dropped events (SYN_DROPPED): resync buttons at the next SYN_REPORT
+        self.resync = False
+
+    def rescan(self, paths: Optional[List[str]] = None) -> Optional[InputDevice]:
+        """Look for a mouse among paths (all devices if omitted) and attach it. Returns the newly attached device."""
+        try:
+            mouse_dev = pick_mouse_device(paths)
+        except Exception as e:
+            log(f"Error detecting mouse: {e}")
+            mouse_dev = None
 
-    def stop(self):
-        """Stop the mouse bridge."""
-        self.running = False
+        if mouse_dev is None:
+            return None
 
-    def run(self):
-        """Run mouse bridge with dynamic device detection."""
-        log("Mouse bridge started (dynamic mode)")
+        log(f"Mouse device detected: {mouse_dev.path} ({mouse_dev.name})")
+        self.current_device = mouse_dev
 
-        while self.running:
-            # Try to find mouse device
+        if self.args.grab:
             try:
-                mouse_dev = pick_mouse_device()
+                mouse_dev.grab()
+                log("Grabbed mouse device exclusively")
             except Exception as e:
-                log(f"Error detecting mouse: {e}")
-                mouse_dev = None
-
-            if mouse_dev is None:
-                if self.current_device is not None:
-                    log("Mouse device removed")
-                    self.current_device = None
-                # Wait before retrying
-                time.sleep(1.0)
-                continue
-
-            # New mouse device found
-            if self.current_device is None or self.current_device.path != mouse_dev.path:
-                log(f"Mouse device detected: {mouse_dev.path} ({mouse_dev.name})")
-                self.current_device = mouse_dev
+                log(f"Failed to grab mouse: {e}")
+        os.set_blocking(mouse_dev.fd, False)
 
-                if self.args.grab:
-                    try:
-                        mouse_dev.grab()
-                        log("Grabbed mouse device exclusively")
-                    except Exception as e:
-                        log(f"Failed to grab mouse: {e}")
+        self.buttons = 0
+        self.prev_buttons = 0
+        self.dx_accum = 0
+        self.dy_accum = 0
+        self.wheel_accum = 0
+        self.flush_deadline = None
+        self.resync = False
 
-            # Process mouse events
-            try:
-                self._process_mouse_events(mouse_dev)
-            except OSError as e:
-                # Device disappeared
-                log(f"Mouse device error: {e}")
-                if self.current_device:
-                    try:
-                        if self.args.grab:
-                            self.current_device.ungrab()
-                    except Exception:
-                        pass
-                    self.current_device = None
-                time.sleep(0.5)
-            except Exception as e:
-                log(f"Unexpected mouse error: {e}")
-                time.sleep(0.5)
+        # Send initial state
+        self.hid.write(EMPTY_MOUSE_REPORT)
+        return mouse_dev
 
-        # Cleanup on exit
+    def detach(self) -> None:
+        """Forget the current mouse device after it disappeared."""
         if self.current_device:
             try:
-                write_report(self.hidfd, build_mouse_report(0, 0, 0, 0))
+                if self.args.grab:
+                    self.current_device.ungrab()
             except Exception:
                 pass
+            self.current_device = None
+        self.flush_deadline = None
+
+    def handle_events(self) -> None:
+        """Process buffered events from the mouse device."""
+        # Bind constants and attributes used per event to locals
+        EV_REL = ecodes.EV_REL
+        EV_KEY = ecodes.EV_KEY
+        EV_SYN = ecodes.EV_SYN
+        SYN_REPORT = ecodes.SYN_REPORT
+        SYN_DROPPED = ecodes.SYN_DROPPED
+        REL_X = ecodes.REL_X
+        REL_Y = ecodes.REL_Y
+        REL_WHEEL = ecodes.REL_WHEEL
+        button_lut = BUTTON_LUT
+
+        # --show wraps the stream in a tracer so the loop below has no debug branches
+        events = read_events(self.current_device.fd)
+        if self.args.show:
+            events = self._trace_events(events)
+
+        # Motion of the current frame, added to the accumulators at SYN_REPORT
+        dx = dy = wheel = 0
+
+        # Branches are ordered by frequency: motion, then frame ends, then buttons
+        for etype, code, value in events:
+            if etype == EV_REL:
+                if code == REL_X:
+                    dx += value
+                elif code == REL_Y:
+                    dy += value
+                elif code == REL_WHEEL:
+                    wheel += value
+
+            elif etype == EV_SYN:
+                if code == SYN_REPORT:
+                    if dx or dy or wheel:
+                        self.dx_accum += dx
+                        self.dy_accum += dy
+                        self.wheel_accum += wheel
+                        dx = dy = wheel = 0
+                    if self.resync:
+                        self.resync_buttons()
+                    if self.buttons != self.prev_buttons:
+                        # Button changes go out immediately, with any pending motion
+                        self.flush()
+                    elif self.dx_accum != 0 or self.dy_accum != 0 or self.wheel_accum != 0:
+                        self.schedule_flush()
+
+                elif code == SYN_DROPPED:
+                    # Our reads fell behind and the kernel buffer overflowed
+                    self.resync = True
+
+            elif etype == EV_KEY:
+                bit = button_lut[code]
+                if bit:
+                    if value == 1:
+                        self.buttons |= bit
+                    elif value == 0:
+                        self.buttons &= ~bit
+
+        # Keep motion of a frame whose SYN_REPORT has not been read yet
+        self.dx_accum += dx
+        self.dy_accum += dy
+        self.wheel_accum += wheel
+
+    @staticmethod
+    def _trace_events(events):
+        """Print mouse events for --show as they pass through."""
+        for event in events:
+            etype, code, value = event
+            if etype == ecodes.EV_REL:
+                print(f"EV_REL {REL_NAMES[code]} value={value}", file=sys.stderr)
+            elif etype == ecodes.EV_KEY and BUTTON_LUT[code]:
+                print(f"EV_KEY {BUTTON_NAMES[code]} value={value}", file=sys.stderr)
+            yield event
+
+    def resync_buttons(self) -> None:
+        """Rebuild button state from the device after the kernel dropped events."""
+        self.resync = False
+        buttons = 0
+        for code in self.current_device.active_keys():
+            buttons |= BUTTON_LUT[code]
+        self.buttons = buttons
+        if self.args.show:
+            print(f"[!] Events dropped, resynced buttons={buttons:02x}", file=sys.stderr)
+
+    def schedule_flush(self) -> None:
+        """Arm the coalescing deadline for accumulated motion."""
+        if self.coalesce <= 0:
+            self.flush()
+        elif self.flush_deadline is None:
+            self.flush_deadline = time.monotonic() + self.coalesce
+
+    def flush(self) -> None:
+        """Write accumulated motion and button state to the HID gadget."""
+        self.flush_deadline = None
+        buttons = self.buttons
+        report = self.report
+        pack_into = MOUSE_REPORT.pack_into
+        write = self.hid.write
+        while True:
+            # Split deltas that do not fit in one report instead of dropping them
+            dx = clamp_i8(self.dx_accum)
+            dy = clamp_i8(self.dy_accum)
+            wheel = clamp_i8(self.wheel_accum)
+            pack_into(report, 0, buttons, dx, dy, wheel)
+            write(report)
+            if self.args.show:
+                print(f"MOUSE: buttons={buttons:02x} dx={dx} dy={dy} wheel={wheel}", file=sys.stderr)
+
+            self.dx_accum -= dx
+            self.dy_accum -= dy
+            self.wheel_accum -= wheel
+            if self.dx_accum == 0 and self.dy_accum == 0 and self.wheel_accum == 0:
+                break
+        self.prev_buttons = buttons
+
+    def close(self) -> None:
+        """Release all buttons and the mouse grab."""
+        if self.current_device:
             try:
-                if self.args.grab:
-                    self.current_device.ungrab()
+                self.hid.write(EMPTY_MOUSE_REPORT)
             except Exception:
                 pass
+            self.detach()
 
-    def _process_mouse_events(self, dev: InputDevice):
-        """Process events from mouse device."""
-        buttons = 0
-        prev_buttons = 0
-        dx_accum = 0
-        dy_accum = 0
-        wheel_accum = 0
 
-        # Send initial state
-        write_report(self.hidfd, build_mouse_report(0, 0, 0, 0))
+# ============================================================================
+# Reactor
+# ============================================================================
 
-        for e in dev.read_loop():
-            if not self.running:
-                break
+def run_bridge(args, keyboard_fd: int, mouse_fd: int) -> None:
+    """Run keyboard and mouse bridges from a single selector loop."""
+    dev = InputDevice(args.event) if args.event else pick_keyboard_device()
+    log(f"Using keyboard device: {dev.path} ({dev.name})")
+
+    keyboard_hid = HidGadget(keyboard_fd)
+    mouse_hid = HidGadget(mouse_fd)
+    gadgets = (keyboard_hid, mouse_hid)
+    polling_out = {keyboard_fd: False, mouse_fd: False}
+
+    # Each registration carries its readiness callback as the key's data
+    sel = selectors.DefaultSelector()
+
+    keyboard = KeyboardBridge(args, keyboard_hid, dev)
+    sel.register(dev.fd, selectors.EVENT_READ, keyboard.handle_events)
+    mouse = MouseBridge(args, mouse_hid)
+    log("Mouse bridge started (dynamic mode)")
+
+    # Rescan only when an input device is added; poll every second if hotplug can't be watched
+    hotplug = open_hotplug_monitor()
+    if hotplug is not None:
+        log(f"Watching for mouse hotplug ({type(hotplug).__name__})")
+    rescan_interval = None if hotplug is not None else 1.0
+
+    mouse_evfd = -1
+    next_rescan: Optional[float] = 0.0
+    # Nodes announced by hotplug since the last rescan; None means scan every device
+    rescan_nodes: Optional[List[str]] = None
+
+    def on_mouse_events() -> None:
+        nonlocal mouse_evfd, next_rescan, rescan_nodes
+        try:
+            mouse.handle_events()
+        except OSError as e:
+            # Device disappeared
+            log(f"Mouse device error: {e}")
+            log("Mouse device removed")
+            sel.unregister(mouse_evfd)
+            mouse_evfd = -1
+            mouse.detach()
+            # Another mouse may already be plugged in, so look at everything once
+            rescan_nodes = None
+            next_rescan = time.monotonic() + 0.5
+
+    def on_hotplug() -> None:
+        nonlocal next_rescan
+        nodes = hotplug.added_nodes()
+        if nodes and mouse.current_device is None:
+            if rescan_nodes is not None:
+                rescan_nodes.extend(nodes)
+            next_rescan = 0.0
+
+    if hotplug is not None:
+        sel.register(hotplug.fileno(), selectors.EVENT_READ, on_hotplug)
+
+    try:
+        while True:
+            deadlines = []
+
+            # Look for a mouse while none is attached
+            if mouse.current_device is None:
+                now = time.monotonic()
+                if next_rescan is not None and now >= next_rescan:
+                    if mouse.rescan(rescan_nodes) is not None:
+                        mouse_evfd = mouse.current_device.fd
+                        sel.register(mouse_evfd, selectors.EVENT_READ, on_mouse_events)
+                    elif rescan_interval is not None:
+                        # Wait before retrying
+                        next_rescan = now + rescan_interval
+                    else:
+                        next_rescan = None
+                    if hotplug is not None:
+                        # From now on only look at nodes the monitor reports
+                        rescan_nodes = []
+                if mouse.current_device is None and next_rescan is not None:
+                    deadlines.append(next_rescan)
+            if mouse.flush_deadline is not None:
+                deadlines.append(mouse.flush_deadline)
+
+            # Send reports queued during the last wakeup, one writev per gadget.
+            # Only watch for writability while a gadget has reports stuck behind a busy endpoint
+            for gadget in gadgets:
+                if gadget.can_flush():
+                    gadget.flush()
+                if gadget.want_write != polling_out[gadget.fd]:
+                    if gadget.want_write:
+                        sel.register(gadget.fd, selectors.EVENT_WRITE, gadget.flush)
+                    else:
+                        sel.unregister(gadget.fd)
+                    polling_out[gadget.fd] = gadget.want_write
+                if gadget.retry_at is not None:
+                    deadlines.append(gadget.retry_at)
+
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+
+            # --show output of the last wakeup goes out in one write
+            if args.show:
+                sys.stderr.flush()
 
-            if e.type == ecodes.EV_REL:
-                if e.code == ecodes.REL_X:
-                    dx_accum += e.value
-                elif e.code == ecodes.REL_Y:
-                    dy_accum += e.value
-                elif e.code == ecodes.REL_WHEEL:
-                    wheel_accum += e.value
-
-                if self.args.show:
-                    rel_name = ecodes.REL.get(e.code, f"REL_{e.code}")
-                    print(f"EV_REL {rel_name} value={e.value}", file=sys.stderr)
-
-            elif e.type == ecodes.EV_KEY:
-                if e.code in BUTTON_MAP:
-                    bit = BUTTON_MAP[e.code]
-                    if e.value == 1:
-                        buttons |= bit
-                    elif e.value == 0:
-                        buttons &= ~bit
-
-                    if self.args.show:
-                        btn_name = ecodes.BTN.get(e.code, f"BTN_{e.code}")
-                        print(f"EV_KEY {btn_name} value={e.value}", file=sys.stderr)
-
-            elif e.type == ecodes.EV_SYN and e.code == ecodes.SYN_REPORT:
-                if dx_accum != 0 or dy_accum != 0 or wheel_accum != 0 or buttons != prev_buttons:
-                    write_report(self.hidfd, build_mouse_report(buttons, dx_accum, dy_accum, wheel_accum))
-                    if self.args.show:
-                        print(f"MOUSE: buttons={buttons:02x} dx={dx_accum} dy={dy_accum} wheel={wheel_accum}", file=sys.stderr)
-
-                    dx_accum = 0
-                    dy_accum = 0
-                    wheel_accum = 0
-                    prev_buttons = buttons
+            for key, _ in sel.select(timeout):
+                key.data()
+
+            now = time.monotonic()
+
+            # Send coalesced mouse motion once its window has passed
+            if mouse.flush_deadline is not None and now >= mouse.flush_deadline:
+                mouse.flush()
+
+            # Retry gadgets whose host was not connected yet
+            for gadget in gadgets:
+                if gadget.retry_at is not None and now >= gadget.retry_at:
+                    gadget.flush()
+    finally:
+        sel.close()
+        mouse.close()
+        keyboard.close()
+        for gadget in gadgets:
+            try:
+                gadget.sync(timeout=1.0)
+            except Exception:
+                pass
 
 
 # ============================================================================
@@ -486,17 +947,37 @@ def main() -> int:
     ap.add_argument("--grab", action="store_true", help="exclusive grab input devices")
     ap.add_argument("--show", action="store_true", help="print events for debugging")
     ap.add_argument("--no-setup", action="store_true", help="skip calling setup-hid-gadget.sh")
+    ap.add_argument("--rt", action="store_true", help="lock memory and run with SCHED_FIFO (requires root)")
+    ap.add_argument("--rt-priority", type=int, default=20, help="SCHED_FIFO priority for --rt (default: 20)")
+    ap.add_argument("--cpu", type=int, help="pin the bridge to this CPU core (e.g. one isolated with isolcpus=)")
+    ap.add_argument("--mouse-coalesce-ms", type=float, default=2.0,
+                    help="batch mouse motion for this many ms before sending (0 = every event, default: 2)")
     args = ap.parse_args()
 
+    if args.show:
+        # Block-buffer stderr so per-event debug lines don't cost a write() each;
+        # the reactor flushes once per wakeup. sys.__stderr__ keeps the old stream open
+        sys.stderr.flush()
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding=sys.stderr.encoding,
+                                      errors=sys.stderr.errors, line_buffering=False)
+
     # Get script directory
     script_dir = Path(__file__).parent.resolve()
 
     # Setup HID gadget first (unless --no-setup)
     if not args.no_setup:
-        if not setup_hid_gadget(script_dir):
+        # Gadget already bound (e.g. service restart): skip the shell round trip
+        if is_char_device(args.hidg_keyboard) and is_char_device(args.hidg_mouse):
+            log("USB HID gadget already configured, skipping setup")
+        elif not setup_hid_gadget(script_dir):
             log("ERROR: Failed to setup HID gadget")
             return 1
 
+    if args.rt:
+        enable_realtime(args.rt_priority)
+    if args.cpu is not None:
+        set_cpu_affinity(args.cpu)
+
     # Open HID devices
     try:
         keyboard_fd = open_hidg(args.hidg_keyboard)
@@ -513,21 +994,12 @@ def main() -> int:
         os.close(keyboard_fd)
         return 1
 
-    # Start mouse bridge in separate thread
-    mouse_bridge = MouseBridge(args, mouse_fd)
-    mouse_thread = threading.Thread(target=mouse_bridge.run, daemon=True)
-    mouse_thread.start()
-
-    # Run keyboard bridge in main thread
+    # Run keyboard and mouse bridges in a single event loop
     try:
-        run_keyboard_bridge(args, keyboard_fd)
+        run_bridge(args, keyboard_fd, mouse_fd)
     except KeyboardInterrupt:
         log("Shutting down...")
     finally:
-        # Stop mouse bridge
-        mouse_bridge.stop()
-        mouse_thread.join(timeout=2.0)
-
         # Close HID devices
         try:
             os.close(keyboard_fd)